@@ -12,7 +12,14 @@ warnings.filterwarnings('ignore', category=FutureWarning, module='plotly')
 
 from code_executor import execute_code
 from data_analysis import DatasetSummary, get_summary
-from llm_utils import LLMResponse, LLMResponseError, ask_llm, reset_chat_session, send_execution_results
+from llm_utils import (
+    NO_VERIFICATION_OUTPUT,
+    LLMResponse,
+    LLMResponseError,
+    ask_llm,
+    reset_chat_session,
+    send_execution_results,
+)
 
 
 st.set_page_config(page_title="AI Data Analyst", layout="wide", page_icon="🤖")
@@ -29,6 +36,12 @@ def _ensure_session_state() -> None:
         st.session_state.setdefault(key, default)
 
 
+@st.cache_data(show_spinner=False, persist="disk", max_entries=16)
+def _get_summary_cached(file_bytes: bytes, file_name: str) -> DatasetSummary:
+    """Summarise an uploaded CSV, memoised on its name and contents across reruns and restarts."""
+    return get_summary(file_bytes)
+
+
 def _render_message(message: dict) -> None:
     """Render a single chat message."""
     if message["role"] == "user":
@@ -50,6 +63,10 @@ def _render_message(message: dict) -> None:
                 for idx, table in enumerate(message["tables"], start=1):
                     st.dataframe(table, use_container_width=True, key=f"msg-{message.get('id', 0)}-table-{idx}")
             
+            # Display printed output of text answers
+            if "stdout" in message:
+                st.code(message["stdout"], language=None)
+            
             # Display suggestions
             if "suggestions" in message:
                 with st.expander("💡 Suggestions for next analysis", expanded=False):
@@ -116,22 +133,29 @@ def _process_user_query(user_query: str) -> None:
             # Convert first table to string representation
             verification_output = verification_result.tables[0].to_string()
         else:
-            # Check if there's a value in local scope
-            verification_output = "Verification code executed successfully but produced no output."
+            verification_output = NO_VERIFICATION_OUTPUT
         
-        # Send results back to LLM for final analysis
-        try:
-            llm_result = send_execution_results(verification_output)
-        except (LLMResponseError, EnvironmentError) as exc:
-            st.session_state.chat_history.append({
-                "role": "assistant",
-                "error": f"❌ Error processing verification results: {str(exc)}",
-                "id": len(st.session_state.chat_history)
-            })
-            return
+        if llm_result.can_finish_locally(verification_output):
+            # The final step came with the verification query; fill in the results locally
+            llm_result = llm_result.with_verification_result(verification_output)
+        else:
+            # Send results back to LLM for final analysis
+            try:
+                llm_result = send_execution_results(verification_output)
+            except (LLMResponseError, EnvironmentError) as exc:
+                st.session_state.chat_history.append({
+                    "role": "assistant",
+                    "error": f"❌ Error processing verification results: {str(exc)}",
+                    "id": len(st.session_state.chat_history)
+                })
+                return
     
-    # Execute final analysis code
-    execution_result = execute_code(llm_result.code, st.session_state.dataset_summary.dataframe)
+    # Execute final analysis code, collecting only the kind of output the LLM declared
+    execution_result = execute_code(
+        llm_result.code,
+        st.session_state.dataset_summary.dataframe,
+        output_kind=llm_result.output_kind or None,
+    )
     
     # Add assistant response to chat history
     assistant_message = {
@@ -152,6 +176,9 @@ def _process_user_query(user_query: str) -> None:
             assistant_message["figures"] = execution_result.figures
         if execution_result.tables:
             assistant_message["tables"] = execution_result.tables
+        # A text answer's result is what the code printed
+        if llm_result.output_kind == "text" and execution_result.stdout:
+            assistant_message["stdout"] = execution_result.stdout
     
     st.session_state.chat_history.append(assistant_message)
 
@@ -172,7 +199,7 @@ def main() -> None:
             if not st.session_state.dataset_uploaded or st.session_state.get("last_uploaded_file") != uploaded_file.name:
                 try:
                     with st.spinner("Loading dataset..."):
-                        summary = get_summary(uploaded_file)
+                        summary = _get_summary_cached(uploaded_file.getvalue(), uploaded_file.name)
                     st.session_state.dataset_summary = summary
                     st.session_state.dataset_uploaded = True
                     st.session_state.last_uploaded_file = uploaded_file.name
@@ -2,18 +2,30 @@
 
 from __future__ import annotations
 
+import ast
 import builtins
+import ctypes
+import functools
 import io
+import sys
+import threading
 import traceback
-from contextlib import redirect_stdout
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Any, Dict, Iterable, List
+from types import CodeType, MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 
+# With Copy-on-Write a shallow copy of the dataset is enough to isolate generated
+# code that modifies ``df``; only the columns it writes to get copied. The mode
+# is always on (and the option deprecated) from pandas 3.0.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
 SAFE_BUILTINS = {
     name: getattr(builtins, name)
@@ -46,10 +58,110 @@ SAFE_BUILTINS = {
         "TypeError",
         "AttributeError",
         "IndexError",
+        "Exception",
     )
 }
 
 
+# Read-only template for the execution namespace; each run copies it and adds `df`
+_BASE_GLOBALS = MappingProxyType({
+    "__builtins__": SAFE_BUILTINS,
+    "pd": pd,
+    "np": np,
+    "px": px,
+    "go": go,
+    "make_subplots": make_subplots,
+    # Allow common exceptions
+    "ValueError": ValueError,
+    "KeyError": KeyError,
+    "TypeError": TypeError,
+})
+
+# Wall-clock budget for a single execution of generated code
+EXECUTION_TIMEOUT_SECONDS = 10.0
+
+# How long to wait for a timed-out worker to exit before interrupting it again
+_TIMEOUT_RETRY_SECONDS = 0.05
+
+# Imports of what the namespace already provides, as (module, imported name, bound name)
+_PRELOADED_IMPORTS = frozenset({
+    ("pandas", None, "pd"),
+    ("numpy", None, "np"),
+    ("plotly.express", None, "px"),
+    ("plotly.graph_objects", None, "go"),
+    ("plotly.subplots", "make_subplots", "make_subplots"),
+})
+
+# Calls that generated analysis code never needs
+_DISALLOWED_CALLS = frozenset({"eval", "exec", "open", "compile", "__import__"})
+
+# Upper bound on captured stdout, so printing a huge frame cannot exhaust memory
+# or flood the prompt sent back to the LLM
+MAX_STDOUT_CHARS = 65_536
+STDOUT_TRUNCATION_MARKER = "\n... [output truncated]"
+
+
+class _BoundedStringIO(io.StringIO):
+    """StringIO that silently drops output beyond ``cap`` characters."""
+
+    def __init__(self, cap: int) -> None:
+        super().__init__()
+        self._cap = cap
+        self.truncated = False
+
+    def write(self, s: str) -> int:
+        if self.truncated:
+            return len(s)
+        remaining = self._cap - self.tell()
+        if len(s) > remaining:
+            super().write(s[:remaining])
+            super().write(STDOUT_TRUNCATION_MARKER)
+            self.truncated = True
+            return len(s)
+        return super().write(s)
+
+
+class _ThreadRoutedStdout:
+    """Stand-in for ``sys.stdout`` that sends writes from executor threads to their buffer.
+
+    Library code such as ``DataFrame.info()`` writes to ``sys.stdout`` directly.
+    Routing per thread captures that output without pointing the stream at an
+    executor buffer for every other thread in the process. Everything else
+    (``encoding``, ``fileno()``, ``isatty()``, ...) is the real stream's.
+    """
+
+    def __init__(self, default: Any) -> None:
+        self._default = default
+        self._local = threading.local()
+
+    def route(self, buffer: Optional[io.StringIO]) -> None:
+        self._local.buffer = buffer
+
+    def _target(self) -> Any:
+        buffer = getattr(self._local, "buffer", None)
+        return self._default if buffer is None else buffer
+
+    def write(self, s: str) -> int:
+        return self._target().write(s)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._default, name)
+
+
+_stdout_lock = threading.Lock()
+
+
+def _routed_stdout() -> _ThreadRoutedStdout:
+    """Install the thread-routed stdout once (and again if something replaced it)."""
+    with _stdout_lock:
+        if not isinstance(sys.stdout, _ThreadRoutedStdout):
+            sys.stdout = _ThreadRoutedStdout(sys.stdout)
+        return sys.stdout
+
+
 @dataclass
 class ExecutionResult:
     """Artifacts produced when executing LLM-generated code."""
@@ -64,92 +176,240 @@ class ExecutionResult:
         return self.error is None
 
 
-def _collect_figures(values: Iterable[Any]) -> List[go.Figure]:
-    """Extract Plotly figures from arbitrarily nested iterables."""
+def _collect_outputs(
+    values: Iterable[Any],
+    original_df: pd.DataFrame,
+    *,
+    include_figures: bool = True,
+    include_tables: bool = True,
+) -> Tuple[List[go.Figure], List[pd.DataFrame]]:
+    """Extract Plotly figures and pandas DataFrames from arbitrarily nested containers.
+
+    Containers are walked iteratively in their original order and every object is
+    visited at most once, so shared or self-referencing containers are safe. The
+    dataframe injected as ``df`` is identified by identity and left out of the tables.
+    """
     figures: List[go.Figure] = []
-    for value in values:
-        if isinstance(value, go.Figure):
-            figures.append(value)
-        elif isinstance(value, (list, tuple, set)):
-            figures.extend(_collect_figures(value))
-        elif isinstance(value, dict):
-            figures.extend(_collect_figures(value.values()))
-    return figures
+    tables: List[pd.DataFrame] = []
+    pending = deque(values)
+    seen: Set[int] = set()
 
+    while pending:
+        value = pending.popleft()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
 
-def _collect_tables(values: Iterable[Any], original_df: pd.DataFrame) -> List[pd.DataFrame]:
-    """Extract pandas DataFrames from arbitrarily nested iterables, excluding the original dataframe."""
-    tables: List[pd.DataFrame] = []
-    for value in values:
-        if isinstance(value, pd.DataFrame):
-            # Skip if it's the original dataframe (same shape and columns)
-            is_original = (
-                value.shape == original_df.shape and
-                list(value.columns) == list(original_df.columns)
-            )
-            if not is_original:
+        if isinstance(value, go.Figure):
+            if include_figures:
+                figures.append(value)
+        elif isinstance(value, pd.DataFrame):
+            if include_tables and value is not original_df:
                 tables.append(value)
         elif isinstance(value, (list, tuple, set)):
-            tables.extend(_collect_tables(value, original_df))
+            pending.extendleft(reversed(list(value)))
         elif isinstance(value, dict):
-            tables.extend(_collect_tables(value.values(), original_df))
-    return tables
+            pending.extendleft(reversed(list(value.values())))
+
+    return figures, tables
+
+
+class _DisallowedCodeError(ValueError):
+    """Raised when generated code contains a construct the executor refuses to run."""
+
+
+class _ExecutionTimeout(BaseException):
+    """Raised inside a worker thread to stop code that ran past its time budget.
 
+    Derives from BaseException so that ``except Exception`` in generated code
+    cannot swallow it.
+    """
 
-def execute_code(code: str, dataframe: pd.DataFrame) -> ExecutionResult:
-    """Execute LLM-provided Python code inside a restricted namespace."""
+
+class _CodeNormalizer(ast.NodeTransformer):
+    """Rewrite harmless habits of generated code that the validator would otherwise reject.
+
+    Imports of the preloaded modules are dropped, and catch-all ``except`` clauses
+    are narrowed to ``Exception`` so they cannot swallow the timeout interrupt.
+    """
+
+    def visit_Import(self, node: ast.Import) -> ast.AST:
+        if all(
+            (alias.name, None, alias.asname or alias.name) in _PRELOADED_IMPORTS
+            for alias in node.names
+        ):
+            return ast.copy_location(ast.Pass(), node)
+        return node
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> ast.AST:
+        if all(
+            (node.module, alias.name, alias.asname or alias.name) in _PRELOADED_IMPORTS
+            for alias in node.names
+        ):
+            return ast.copy_location(ast.Pass(), node)
+        return node
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> ast.AST:
+        if node.type is None:
+            node.type = ast.copy_location(ast.Name(id="Exception", ctx=ast.Load()), node)
+        else:
+            caught = node.type.elts if isinstance(node.type, ast.Tuple) else [node.type]
+            for handler in caught:
+                if isinstance(handler, ast.Name) and handler.id == "BaseException":
+                    handler.id = "Exception"
+        self.generic_visit(node)
+        return node
+
+
+class _CodeValidator(ast.NodeVisitor):
+    """Reject imports, dunder access and dynamic code/file calls before execution."""
+
+    def _reject(self, node: ast.AST, description: str) -> None:
+        raise _DisallowedCodeError(f"{description} (line {getattr(node, 'lineno', '?')})")
+
+    def visit_Import(self, node: ast.Import) -> None:
+        self._reject(node, "import statement")
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        self._reject(node, "import statement")
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        if node.attr.startswith("__"):
+            self._reject(node, f"access to attribute '{node.attr}'")
+        self.generic_visit(node)
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if node.id.startswith("__"):
+            self._reject(node, f"use of name '{node.id}'")
+
+    def visit_Call(self, node: ast.Call) -> None:
+        if isinstance(node.func, ast.Name) and node.func.id in _DISALLOWED_CALLS:
+            self._reject(node, f"call to '{node.func.id}()'")
+        self.generic_visit(node)
+
+
+def _run_with_timeout(target: Callable[[], None], timeout: float) -> bool:
+    """Run ``target`` in a worker thread and return False if it overran ``timeout``.
+
+    Streamlit scripts do not run on the main thread, so signal-based timers are
+    unavailable; an overrunning worker is interrupted by raising _ExecutionTimeout
+    in it asynchronously instead, repeatedly until the thread has exited.
+    """
+    worker = threading.Thread(target=target, name="code-executor", daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if not worker.is_alive():
+        return True
+
+    while worker.is_alive():
+        ctypes.pythonapi.PyThreadState_SetAsyncExc(
+            ctypes.c_ulong(worker.ident), ctypes.py_object(_ExecutionTimeout)
+        )
+        worker.join(_TIMEOUT_RETRY_SECONDS)
+    return False
+
+
+@functools.lru_cache(maxsize=128)
+def _compile(code: str) -> Tuple[CodeType, Optional[CodeType]]:
+    """Compile generated code once, splitting off a trailing expression so its value can be shown.
+
+    Returns the compiled statements and, when the code ends with an expression
+    (even if that is its only statement), that expression compiled for ``eval``.
+    Raises _DisallowedCodeError if the code fails validation.
+    """
+    tree = ast.fix_missing_locations(
+        _CodeNormalizer().visit(ast.parse(code, filename="<llm>", mode="exec"))
+    )
+    _CodeValidator().visit(tree)
+
+    last_expression: Optional[CodeType] = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        expression = ast.Expression(tree.body.pop().value)
+        last_expression = compile(expression, "<llm>", "eval")
+
+    return compile(tree, "<llm>", "exec"), last_expression
+
+
+def execute_code(
+    code: str,
+    dataframe: pd.DataFrame,
+    *,
+    output_kind: Optional[str] = None,
+    timeout: float = EXECUTION_TIMEOUT_SECONDS,
+) -> ExecutionResult:
+    """Execute LLM-provided Python code inside a restricted namespace.
+
+    ``output_kind`` is the kind of result the LLM declared ("figure", "table" or
+    "text"); artifacts of other kinds are not collected. ``None`` collects everything.
+    """
     if not code.strip():
         return ExecutionResult(error="No code to execute.")
 
-    # Put df in safe_globals so it's accessible in list comprehensions and nested scopes
+    try:
+        program, last_expression = _compile(code)
+    except _DisallowedCodeError as exc:
+        return ExecutionResult(error=f"Disallowed construct: {exc}")
+    except SyntaxError:
+        return ExecutionResult(error=traceback.format_exc(limit=4))
+
+    # A shallow copy shares data with the caller's frame until generated code writes to it
+    working_df = dataframe.copy(deep=False)
+
+    stdout_buffer = _BoundedStringIO(cap=MAX_STDOUT_CHARS)
+    errors: List[str] = []
+
+    def captured_print(*args: Any, **kwargs: Any) -> None:
+        kwargs["file"] = stdout_buffer
+        print(*args, **kwargs)
+
+    # Put df in safe_globals so it's accessible in list comprehensions and nested scopes;
+    # print writes straight to this run's buffer
     safe_globals: Dict[str, Any] = {
-        "__builtins__": SAFE_BUILTINS,
-        "pd": pd,
-        "np": np,
-        "px": px,
-        "go": go,
-        "df": dataframe.copy(),  # Make df globally accessible
-        # Allow common exceptions
-        "ValueError": ValueError,
-        "KeyError": KeyError,
-        "TypeError": TypeError,
+        **_BASE_GLOBALS,
+        "__builtins__": {**SAFE_BUILTINS, "print": captured_print},
+        "df": working_df,
     }
     local_scope: Dict[str, Any] = {}
+    routed_stdout = _routed_stdout()
 
-    stdout_buffer = io.StringIO()
+    def run() -> None:
+        routed_stdout.route(stdout_buffer)
+        try:
+            exec(program, safe_globals, local_scope)
+            if last_expression is not None:
+                # Print the value of a trailing expression, as an interactive session would
+                result = eval(last_expression, safe_globals, local_scope)
+                if result is not None:
+                    captured_print(result)
+        except _ExecutionTimeout:
+            pass  # Already reported by execute_code
+        except Exception:
+            errors.append(traceback.format_exc(limit=4))
+        finally:
+            routed_stdout.route(None)
 
-    try:
-        with redirect_stdout(stdout_buffer):
-            # Split code into lines to capture last expression
-            code_lines = code.strip().split('\n')
-            
-            # Check if last line is an expression (not assignment, not control flow)
-            last_line = code_lines[-1].strip() if code_lines else ""
-            is_expression = (
-                last_line and 
-                not last_line.startswith(('if ', 'for ', 'while ', 'def ', 'class ', 'import ', 'from ')) and
-                '=' not in last_line.split('#')[0]  # Check before any comment
-            )
-            
-            if is_expression and len(code_lines) > 1:
-                # Execute all but last line
-                exec('\n'.join(code_lines[:-1]), safe_globals, local_scope)
-                # Evaluate and print last expression
-                result = eval(last_line, safe_globals, local_scope)
-                print(result)
-            else:
-                # Execute normally
-                exec(code, safe_globals, local_scope)
-                
-    except Exception:
-        error_message = traceback.format_exc(limit=4)
-        return ExecutionResult(stdout=stdout_buffer.getvalue(), error=error_message)
-
-    # Collect from both global and local scopes
-    all_values = list(safe_globals.values()) + list(local_scope.values())
-    figures = _collect_figures(all_values)
-    # Pass original dataframe to filter it out from results
-    tables = _collect_tables(all_values, dataframe)
+    if not _run_with_timeout(run, timeout):
+        return ExecutionResult(
+            stdout=stdout_buffer.getvalue(),
+            error=f"Execution timed out after {timeout:g} seconds.",
+        )
+    if errors:
+        return ExecutionResult(stdout=stdout_buffer.getvalue(), error=errors[0])
+
+    # Generated code assigns its results in the local scope; the globals only hold
+    # the preloaded modules and the injected df
+    include_figures = output_kind in (None, "figure")
+    include_tables = output_kind in (None, "table")
+    figures: List[go.Figure] = []
+    tables: List[pd.DataFrame] = []
+    if include_figures or include_tables:
+        # Pass the injected dataframe to filter it out from results
+        figures, tables = _collect_outputs(
+            local_scope.values(),
+            working_df,
+            include_figures=include_figures,
+            include_tables=include_tables,
+        )
 
     return ExecutionResult(
         figures=figures,
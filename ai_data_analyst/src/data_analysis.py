@@ -2,10 +2,18 @@
 
 from __future__ import annotations
 
+import functools
+import io
 from dataclasses import dataclass
 from typing import Any, Dict, Iterable, List, Mapping, Optional
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+# Encodings tried in order when decoding uploaded CSV files
+_ENCODINGS = ("utf-8", "latin-1", "iso-8859-1", "cp1252", "utf-16")
 
 
 @dataclass
@@ -13,22 +21,46 @@ class DatasetSummary:
     """Container holding the dataframe alongside textual and structured summaries."""
 
     dataframe: pd.DataFrame
-    text: str
     details: Mapping[str, Any]
     encoding: str = "utf-8"  # Track which encoding was used
 
+    @functools.cached_property
+    def text(self) -> str:
+        """Compact textual summary for the LLM, built on first access."""
+        return _build_text_summary(self.details)
+
 
-def _format_float(value: Optional[float]) -> str:
-    """Return a compact string representation for numeric values."""
+def _format_float(value: Any) -> str:
+    """Return a compact string representation for numeric and datetime values."""
     if value is None or pd.isna(value):
         return "NA"
+    if isinstance(value, pd.Timestamp):
+        return str(value)
     return f"{value:.2f}"
 
 
-def _collect_column_summary(series: pd.Series, max_top_values: int = 3) -> Dict[str, Any]:
-    """Build a structured summary for a single dataframe column."""
+_NUMERIC_STATISTICS = ("mean", "median", "std", "min", "max")
+_DATETIME_STATISTICS = ("min", "max")
+
+
+def _holds_only_strings(values: pd.Series) -> bool:
+    """Return True if every non-null value (or category) of the column is a string."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return pd.api.types.infer_dtype(values.cat.categories, skipna=True) == "string"
+    return pd.api.types.infer_dtype(values, skipna=True) == "string"
+
+
+def _collect_column_summary(
+    series: pd.Series,
+    *,
+    kind: str,
+    missing_count: int,
+    statistics: Optional[Mapping[str, Any]] = None,
+    unique_count: Optional[int] = None,
+    max_top_values: int = 3,
+) -> Dict[str, Any]:
+    """Build a structured summary for a single column from precomputed frame-level stats."""
     dtype_name = str(series.dtype)
-    missing_count = int(series.isna().sum())
     total = len(series)
     missing_pct = round((missing_count / total) * 100, 2) if total else 0.0
 
@@ -39,36 +71,26 @@ def _collect_column_summary(series: pd.Series, max_top_values: int = 3) -> Dict[
         "missing_pct": missing_pct,
     }
 
-    if pd.api.types.is_numeric_dtype(series):
-        summary["statistics"] = {
-            "mean": _format_float(series.mean()),
-            "median": _format_float(series.median()),
-            "std": _format_float(series.std()),
-            "min": _format_float(series.min()),
-            "max": _format_float(series.max()),
-        }
-    elif pd.api.types.is_datetime64_any_dtype(series):
+    if kind in ("numeric", "datetime"):
         summary["statistics"] = {
-            "min": _format_float(series.min()),
-            "max": _format_float(series.max()),
+            key: _format_float(value) for key, value in (statistics or {}).items()
         }
     else:
         # For categorical columns
-        unique_count = series.nunique(dropna=True)
         summary["unique_count"] = unique_count
         
+        values = series.dropna()
+        # Only mixed-type columns need converting; avoid copying string columns
+        if not _holds_only_strings(values):
+            values = values.astype(str)
+        
         # If unique values < 50, include all unique values
         if unique_count < 50:
-            all_unique = series.dropna().astype(str).unique().tolist()
+            all_unique = values.unique().tolist()
             summary["all_unique_values"] = sorted(all_unique)
         else:
             # Otherwise, just show top N values
-            value_counts = (
-                series.dropna()
-                .astype(str)
-                .value_counts()
-                .head(max_top_values)
-            )
+            value_counts = values.value_counts().head(max_top_values)
             summary["top_values"] = [
                 {"value": index, "count": int(count)}
                 for index, count in value_counts.items()
@@ -77,6 +99,16 @@ def _collect_column_summary(series: pd.Series, max_top_values: int = 3) -> Dict[
     return summary
 
 
+def _aggregate_statistics(
+    dataframe: pd.DataFrame, columns: List[str], statistics: Iterable[str]
+) -> Dict[str, Dict[str, Any]]:
+    """Compute the given aggregations for all ``columns`` in one vectorised call."""
+    if not columns:
+        return {}
+    aggregated = dataframe[columns].agg(list(statistics))
+    return {column: aggregated[column].to_dict() for column in columns}
+
+
 def _build_text_summary(details: Mapping[str, Any]) -> str:
     """Compose a compact textual summary that can be sent to the LLM."""
     lines: List[str] = []
@@ -137,43 +169,144 @@ def _build_text_summary(details: Mapping[str, Any]) -> str:
     return "\n".join(lines)
 
 
+# pandas' default ``na_values`` for read_csv, so both readers count the same cells as missing
+_PANDAS_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+
+# Integers beyond int64 are parsed as doubles by PyArrow but kept exact by pandas
+_INT64_LIMIT = 2**63
+
+
+def _arrow_read_csv(
+    raw: bytes, encoding: str, column_types: Optional[Mapping[str, pa.DataType]] = None
+) -> pa.Table:
+    """Parse CSV bytes into an Arrow table, counting pandas' NA tokens as missing."""
+    return pacsv.read_csv(
+        io.BytesIO(raw),
+        read_options=pacsv.ReadOptions(encoding=encoding, use_threads=True),
+        convert_options=pacsv.ConvertOptions(
+            column_types=column_types,
+            null_values=_PANDAS_NA_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+
+
+def _exceeds_int64(column: pa.ChunkedArray) -> bool:
+    """Return True if a double column holds values outside the int64 range."""
+    largest = pc.max(pc.abs(column)).as_py()
+    return largest is not None and largest >= _INT64_LIMIT
+
+
+def _read_csv(raw: bytes, encoding: str) -> pd.DataFrame:
+    """Parse CSV bytes with PyArrow's multi-threaded reader, falling back to pandas.
+
+    Both paths yield the dtypes plain ``pd.read_csv`` would: date and time columns
+    stay strings, and integers too wide for int64 stay exact.
+    """
+    try:
+        table = _arrow_read_csv(raw, encoding)
+    except pa.ArrowInvalid:
+        table = None
+
+    # PyArrow is stricter than pandas about ragged rows, keeps undecodable text as
+    # binary columns, and neither de-duplicates header names nor renames empty ones
+    # to "Unnamed: N"; let pandas handle those, and wide integers PyArrow made doubles
+    if (
+        table is None
+        or len(set(table.column_names)) != table.num_columns
+        or any(not name.strip() for name in table.column_names)
+        or any(pa.types.is_binary(column.type) for column in table.schema)
+        or any(
+            pa.types.is_floating(field.type) and _exceeds_int64(table.column(index))
+            for index, field in enumerate(table.schema)
+        )
+    ):
+        return pd.read_csv(io.BytesIO(raw), encoding=encoding)
+
+    # PyArrow infers dates, times and timestamps that pandas leaves as text; re-read
+    # those columns as strings so the values match the original cells exactly
+    temporal = {field.name: pa.string() for field in table.schema if pa.types.is_temporal(field.type)}
+    if temporal:
+        table = _arrow_read_csv(raw, encoding, column_types=temporal)
+
+    # Entirely empty columns are typed as null by PyArrow; match pandas' float64
+    for index, column in enumerate(table.schema):
+        if pa.types.is_null(column.type):
+            table = table.set_column(index, column.name, table.column(index).cast(pa.float64()))
+
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
 def get_summary(file_like: Any, *, max_top_values: int = 3) -> DatasetSummary:
-    """Load a CSV file-like object and return a structured summary for downstream use."""
-    if hasattr(file_like, "seek"):
-        file_like.seek(0)
+    """Load a CSV file-like object (or its raw bytes) and return a structured summary."""
+    if isinstance(file_like, (bytes, bytearray)):
+        raw = bytes(file_like)
+    else:
+        if hasattr(file_like, "seek"):
+            file_like.seek(0)
+        raw = file_like.read()
 
     # Try multiple encodings to handle different file formats
-    encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252', 'utf-16']
     dataframe = None
     last_error = None
     used_encoding = 'utf-8'
     
-    for encoding in encodings:
+    for encoding in _ENCODINGS:
         try:
-            if hasattr(file_like, "seek"):
-                file_like.seek(0)
-            dataframe = pd.read_csv(file_like, encoding=encoding)
+            dataframe = _read_csv(raw, encoding)
             used_encoding = encoding
             break  # Success! Stop trying other encodings
-        except (UnicodeDecodeError, LookupError) as e:
+        except (UnicodeError, LookupError) as e:
             last_error = e
             continue
     
     if dataframe is None:
         raise ValueError(
-            f"Unable to read CSV file with any of the supported encodings: {', '.join(encodings)}. "
+            f"Unable to read CSV file with any of the supported encodings: {', '.join(_ENCODINGS)}. "
             f"Last error: {last_error}"
         )
     
     dataframe.columns = [str(col) for col in dataframe.columns]
 
+    # Classify columns by dtype in bulk and compute per-column stats for the whole
+    # frame up front instead of scanning each column inside _collect_column_summary
+    numeric_columns = dataframe.select_dtypes(
+        include=["number", "bool"], exclude=["timedelta"]
+    ).columns.tolist()
+    datetime_columns = dataframe.select_dtypes(include=["datetime", "datetimetz"]).columns.tolist()
+    column_kinds = {
+        **{column: "numeric" for column in numeric_columns},
+        **{column: "datetime" for column in datetime_columns},
+    }
+    categorical_columns = [
+        column for column in dataframe.columns if column not in column_kinds
+    ]
+
+    missing_counts = dataframe.isna().sum()
+    unique_counts = dataframe[categorical_columns].nunique(dropna=True)
+    column_statistics = {
+        **_aggregate_statistics(dataframe, numeric_columns, _NUMERIC_STATISTICS),
+        **_aggregate_statistics(dataframe, datetime_columns, _DATETIME_STATISTICS),
+    }
+
     column_details = [
-        _collect_column_summary(dataframe[column], max_top_values=max_top_values)
+        _collect_column_summary(
+            dataframe[column],
+            kind=column_kinds.get(column, "categorical"),
+            missing_count=int(missing_counts[column]),
+            statistics=column_statistics.get(column),
+            unique_count=int(unique_counts[column]) if column in unique_counts else None,
+            max_top_values=max_top_values,
+        )
         for column in dataframe.columns
     ]
 
     total_cells = dataframe.shape[0] * dataframe.shape[1]
-    missing_cells = int(dataframe.isna().sum().sum())
+    missing_cells = int(missing_counts.to_numpy().sum())
     missing_pct = round((missing_cells / total_cells) * 100, 2) if total_cells else 0.0
 
     details: Dict[str, Any] = {
@@ -183,14 +316,10 @@ def get_summary(file_like: Any, *, max_top_values: int = 3) -> DatasetSummary:
             "total_missing": missing_cells,
             "missing_pct": missing_pct,
         },
-        "preview_rows": dataframe.head(5).to_dict(orient="records"),
     }
 
-    text_summary = _build_text_summary(details)
-
     return DatasetSummary(
         dataframe=dataframe,
-        text=text_summary,
         details=details,
         encoding=used_encoding,
     )
@@ -2,12 +2,18 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
 import json
 import os
+import re
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Dict, List, Optional, Sequence, TypeVar
 
+import orjson
+import streamlit as st
 from dotenv import load_dotenv
 from google import genai  # type: ignore
 from google.genai import types  # type: ignore
@@ -18,7 +24,26 @@ load_dotenv()
 # Global chat session storage
 _chat_session = None
 _current_data_summary = None
-_client = None
+
+_T = TypeVar("_T")
+
+_CODE_FENCE_RE = re.compile(r"\A```[^\n]*\n?(.*?)\n?(?:^[ \t]*```[ \t]*)?\Z", re.DOTALL | re.MULTILINE)
+_PRELOADED_IMPORT_RE = re.compile(
+    r"^[ \t]*(?:import|from)[ \t]+(?:pandas|numpy|plotly)\b[^\n]*\n?", re.MULTILINE
+)
+
+# Result kinds the LLM may declare in `output_kind`
+OUTPUT_KINDS = ("figure", "table", "text")
+
+# Marker the LLM puts in `analysis_template` / `final_code` where the verification output belongs
+VERIFICATION_PLACEHOLDER = "{{verification_result}}"
+
+# Longer verification output is sent back to the LLM to interpret instead of being
+# substituted into the bundled final step as is
+MAX_LOCAL_VERIFICATION_CHARS = 2_000
+
+# Stand-in for the output of verification code that printed nothing and built no table
+NO_VERIFICATION_OUTPUT = "Verification code executed successfully but produced no output."
 
 
 class LLMResponseError(RuntimeError):
@@ -33,10 +58,77 @@ class LLMResponse:
     code: str
     suggestions: str
     needs_verification: bool = False  # True if this is a verification query
+    output_kind: str = ""  # "figure", "table" or "text" if declared by the LLM
+    # Final step sent along with a verification query, so it needs no second round-trip
+    final_code: str = ""
+    analysis_template: str = ""  # Contains VERIFICATION_PLACEHOLDER
+
+    @property
+    def has_final_step(self) -> bool:
+        return bool(self.final_code and self.analysis_template)
+
+    def can_finish_locally(self, verification_output: str) -> bool:
+        """Return True if the final step can be built without another LLM round-trip.
+
+        Empty output, or the no-output stand-in, has nothing to substitute, so the
+        LLM has to interpret it instead.
+        """
+        if not verification_output.strip() or verification_output == NO_VERIFICATION_OUTPUT:
+            return False
+        return self.has_final_step and len(verification_output) <= MAX_LOCAL_VERIFICATION_CHARS
+
+    def with_verification_result(self, verification_output: str) -> "LLMResponse":
+        """Build the final response by filling the verification output into the templates.
+
+        The output is inserted verbatim into the analysis text and as a string
+        literal into the final code, so the code stays valid Python.
+        """
+        return LLMResponse(
+            analysis=self.analysis_template.replace(VERIFICATION_PLACEHOLDER, verification_output),
+            code=self.final_code.replace(VERIFICATION_PLACEHOLDER, repr(verification_output)),
+            suggestions=self.suggestions,
+            output_kind=self.output_kind,
+        )
+
 
+@st.cache_resource(show_spinner=False)
+def _get_client(api_key: str) -> genai.Client:
+    """Return a Gemini client shared across Streamlit reruns for the given API key."""
+    return genai.Client(api_key=api_key)
+
+
+def _get_or_create_client(api_key: Optional[str] = None) -> genai.Client:
+    """Return the shared Gemini client, resolving the API key from the environment if needed."""
+    if api_key is None:
+        api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise EnvironmentError(
+            "GEMINI_API_KEY is not set. Please configure your Gemini API key."
+        )
+    return _get_client(api_key)
 
+
+@st.cache_resource(show_spinner=False)
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the background event loop that owns all async Gemini calls.
+
+    The async client's connection pool is bound to the loop it first runs on, so
+    every request goes through this single long-lived loop instead of a fresh
+    ``asyncio.run`` per call.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="gemini-event-loop", daemon=True).start()
+    return loop
+
+
+def _run_async(coroutine: Awaitable[_T]) -> _T:
+    """Run a coroutine on the background event loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_event_loop()).result()
+
+
+@functools.lru_cache(maxsize=None)
 def _load_system_prompt(prompt_path: Optional[Path] = None) -> str:
-    """Read the system prompt instructions from disk."""
+    """Read the system prompt instructions from disk (once per path)."""
     if prompt_path is None:
         # Navigate to ai_data_analyst/prompts/system_prompt.txt from ai_data_analyst/src/
         prompt_path = Path(__file__).resolve().parent.parent / "prompts" / "system_prompt.txt"
@@ -61,33 +153,28 @@ def _build_user_content(user_query: str, data_summary: str) -> str:
 def _extract_code_from_markdown(code_text: str) -> str:
     """Extract actual Python code from markdown code blocks."""
     code_text = code_text.strip()
-    
-    # Check if wrapped in triple backticks
-    if code_text.startswith("```"):
-        lines = code_text.split('\n')
-        # Remove first line (```python or ```)
-        lines = lines[1:]
-        # Remove last line if it's ```
-        if lines and lines[-1].strip() == "```":
-            lines = lines[:-1]
-        code_text = '\n'.join(lines)
-    
+
+    # Unwrap a ```python ... ``` fence (the closing fence is optional)
+    fenced = _CODE_FENCE_RE.match(code_text)
+    if fenced:
+        code_text = fenced.group(1)
+
     # Remove import statements since pd, np, px, go are pre-imported in execution environment
-    lines = code_text.split('\n')
-    filtered_lines = []
-    for line in lines:
-        stripped = line.strip()
-        # Skip import lines for pre-loaded modules
-        if stripped.startswith('import pandas') or \
-           stripped.startswith('import numpy') or \
-           stripped.startswith('import plotly') or \
-           stripped.startswith('from pandas') or \
-           stripped.startswith('from numpy') or \
-           stripped.startswith('from plotly'):
-            continue
-        filtered_lines.append(line)
-    
-    return '\n'.join(filtered_lines)
+    return _PRELOADED_IMPORT_RE.sub("", code_text)
+
+
+def _parse_payload(message_content: str) -> Dict[str, Any]:
+    """Decode the JSON body of an LLM reply."""
+    try:
+        return orjson.loads(message_content.encode("utf-8"))
+    except (orjson.JSONDecodeError, UnicodeEncodeError):
+        pass
+
+    # orjson rejects NaN/Infinity literals (and lone surrogates) that json accepts
+    try:
+        return json.loads(message_content)
+    except json.JSONDecodeError as exc:
+        raise LLMResponseError("Failed to parse JSON from LLM response.") from exc
 
 
 def _ensure_response_shape(payload: Dict[str, Any]) -> LLMResponse:
@@ -107,48 +194,49 @@ def _ensure_response_shape(payload: Dict[str, Any]) -> LLMResponse:
     # Get needs_verification flag (default to False if not present)
     needs_verification = payload.get("needs_verification", False)
 
+    # Declared kind of result; anything unexpected means "unknown"
+    output_kind = str(payload.get("output_kind") or "").strip().lower()
+    if output_kind not in OUTPUT_KINDS:
+        output_kind = ""
+
+    # Optional final step bundled with a verification query
+    final_code = _extract_code_from_markdown(str(payload.get("final_code") or "").strip())
+    analysis_template = str(payload.get("analysis_template") or "").strip()
+
     return LLMResponse(
         analysis=str(payload["analysis"]).strip(),
         code=clean_code,
         suggestions=str(payload["suggestions"]).strip(),
         needs_verification=needs_verification,
+        output_kind=output_kind,
+        final_code=final_code,
+        analysis_template=analysis_template,
     )
 
 
-def ask_llm(
+async def _send_user_request(
     user_query: str,
     data_summary: str,
     *,
-    model: str = "gemini-2.0-flash-exp",
-    api_key: Optional[str] = None,
-    temperature: float = 0.2,
-    reset_chat: bool = False,
-) -> LLMResponse:
-    """Query the Gemini LLM using chat session for conversation context."""
-    global _chat_session, _current_data_summary, _client
-    
-    if not user_query.strip():
-        raise ValueError("User query must not be empty.")
+    model: str,
+    api_key: Optional[str],
+    temperature: float,
+    reset_chat: bool,
+) -> str:
+    """Send a user request on the current chat session and return the raw reply text."""
+    global _chat_session, _current_data_summary
+
     if not data_summary.strip():
         raise ValueError("Data summary must not be empty.")
 
-    if api_key is None:
-        api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise EnvironmentError(
-            "GEMINI_API_KEY is not set. Please configure your Gemini API key."
-        )
-
-    # Create client if it doesn't exist
-    if _client is None:
-        _client = genai.Client(api_key=api_key)
+    client = _get_or_create_client(api_key)
     
     # Reset chat if requested or if data summary changed (new dataset uploaded)
     if reset_chat or _chat_session is None or _current_data_summary != data_summary:
         system_prompt = _load_system_prompt()
         
         # Start a new chat session with system instructions
-        _chat_session = _client.chats.create(
+        _chat_session = client.aio.chats.create(
             model=model,
             config=types.GenerateContentConfig(
                 temperature=temperature,
@@ -160,34 +248,146 @@ def ask_llm(
         # Store the current data summary for comparison
         _current_data_summary = data_summary
         
-        # Send initial context message with data summary
-        initial_message = f"Dataset summary:\n{data_summary}\n\nI'm ready to analyze this data. What would you like to know?"
-        _chat_session.send_message(initial_message)
+        # Send the data summary together with the first request in a single round-trip
+        user_content = _build_user_content(user_query, data_summary)
+    else:
+        user_content = f"User request: {user_query}"
     
     # Send user query to the chat session
-    user_content = f"User request: {user_query}"
-    response = _chat_session.send_message(user_content)
-    
-    message_content = response.text or ""
+    response = await _chat_session.send_message(user_content)
+    return response.text or ""
 
-    try:
-        payload = json.loads(message_content)
-    except json.JSONDecodeError as exc:
-        raise LLMResponseError("Failed to parse JSON from LLM response.") from exc
 
-    return _ensure_response_shape(payload)
+async def ask_llm_async(
+    user_query: str,
+    data_summary: str,
+    *,
+    model: str = "gemini-2.0-flash-exp",
+    api_key: Optional[str] = None,
+    temperature: float = 0.2,
+    reset_chat: bool = False,
+) -> LLMResponse:
+    """Query the Gemini LLM using chat session for conversation context."""
+    if not user_query.strip():
+        raise ValueError("User query must not be empty.")
+
+    reply = await _send_user_request(
+        user_query,
+        data_summary,
+        model=model,
+        api_key=api_key,
+        temperature=temperature,
+        reset_chat=reset_chat,
+    )
+    return _ensure_response_shape(_parse_payload(reply))
+
+
+def ask_llm(
+    user_query: str,
+    data_summary: str,
+    *,
+    model: str = "gemini-2.0-flash-exp",
+    api_key: Optional[str] = None,
+    temperature: float = 0.2,
+    reset_chat: bool = False,
+) -> LLMResponse:
+    """Blocking wrapper around :func:`ask_llm_async` for synchronous callers."""
+    return _run_async(
+        ask_llm_async(
+            user_query,
+            data_summary,
+            model=model,
+            api_key=api_key,
+            temperature=temperature,
+            reset_chat=reset_chat,
+        )
+    )
+
+
+def _build_batch_query(user_queries: Sequence[str]) -> str:
+    """Combine several user requests into one request asking for an array of answers."""
+    numbered = "\n".join(f"{index}. {query}" for index, query in enumerate(user_queries, 1))
+    return (
+        f"Answer each of the following {len(user_queries)} requests independently:\n"
+        f"{numbered}\n\n"
+        'Respond with a single JSON object of the form {"answers": [...]} holding one '
+        "response object per request, in the same order, each following the usual schema."
+    )
+
+
+def _ensure_batch_shape(payload: Dict[str, Any], expected_count: int) -> List[LLMResponse]:
+    """Validate a batched reply and convert each answer into an LLMResponse object."""
+    answers = payload.get("answers") if isinstance(payload, dict) else None
+    if not isinstance(answers, list) or not all(isinstance(answer, dict) for answer in answers):
+        raise LLMResponseError("LLM batch response must contain an 'answers' array of objects.")
+    if len(answers) != expected_count:
+        raise LLMResponseError(
+            f"LLM batch response has {len(answers)} answers, expected {expected_count}."
+        )
+    return [_ensure_response_shape(answer) for answer in answers]
+
+
+async def ask_llm_batch_async(
+    user_queries: Sequence[str],
+    data_summary: str,
+    *,
+    model: str = "gemini-2.0-flash-exp",
+    api_key: Optional[str] = None,
+    temperature: float = 0.2,
+    reset_chat: bool = False,
+) -> List[LLMResponse]:
+    """Answer several independent user requests with a single chat round-trip.
+
+    The requests share one message on the chat session and the reply is split
+    back into one :class:`LLMResponse` per request, in order. Answers that set
+    ``needs_verification`` cannot be followed up with
+    :func:`send_execution_results`, so use :func:`ask_llm` for those requests.
+    """
+    if not user_queries or not all(query.strip() for query in user_queries):
+        raise ValueError("User queries must not be empty.")
+
+    reply = await _send_user_request(
+        _build_batch_query(user_queries),
+        data_summary,
+        model=model,
+        api_key=api_key,
+        temperature=temperature,
+        reset_chat=reset_chat,
+    )
+    return _ensure_batch_shape(_parse_payload(reply), len(user_queries))
+
+
+def ask_llm_batch(
+    user_queries: Sequence[str],
+    data_summary: str,
+    *,
+    model: str = "gemini-2.0-flash-exp",
+    api_key: Optional[str] = None,
+    temperature: float = 0.2,
+    reset_chat: bool = False,
+) -> List[LLMResponse]:
+    """Blocking wrapper around :func:`ask_llm_batch_async` for synchronous callers."""
+    return _run_async(
+        ask_llm_batch_async(
+            user_queries,
+            data_summary,
+            model=model,
+            api_key=api_key,
+            temperature=temperature,
+            reset_chat=reset_chat,
+        )
+    )
 
 
 def reset_chat_session() -> None:
     """Reset the chat session (useful when uploading a new dataset)."""
-    global _chat_session, _current_data_summary, _client
+    global _chat_session, _current_data_summary
     _chat_session = None
     _current_data_summary = None
-    # Don't close the client, just reset the session
-    # _client remains alive for future requests
+    # The client is cached by _get_client and stays alive for future requests
 
 
-def send_execution_results(execution_output: str) -> LLMResponse:
+async def send_execution_results_async(execution_output: str) -> LLMResponse:
     """Send execution results back to the LLM for follow-up analysis.
     
     This is used in the multi-turn verification flow where the LLM first
@@ -206,14 +406,11 @@ def send_execution_results(execution_output: str) -> LLMResponse:
     
     # Send the execution results to the LLM
     feedback_message = f"Execution results:\n```\n{execution_output}\n```\n\nNow provide the complete analysis based on these results."
-    response = _chat_session.send_message(feedback_message)
+    response = await _chat_session.send_message(feedback_message)
     
-    message_content = response.text or ""
-    
-    try:
-        payload = json.loads(message_content)
-    except json.JSONDecodeError as exc:
-        raise LLMResponseError("Failed to parse JSON from LLM response.") from exc
-    
-    return _ensure_response_shape(payload)
+    return _ensure_response_shape(_parse_payload(response.text or ""))
+
 
+def send_execution_results(execution_output: str) -> LLMResponse:
+    """Blocking wrapper around :func:`send_execution_results_async` for synchronous callers."""
+    return _run_async(send_execution_results_async(execution_output))
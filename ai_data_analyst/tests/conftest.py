@@ -0,0 +1,212 @@
+"""Shared pytest configuration and fixtures for the AI Data Analyst tests."""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import sys
+import typing
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    import httpx
+
+# Add src directory to path (once, even if conftest is imported again)
+SRC_DIR = str((Path(__file__).parent.parent / "src").resolve())
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+# generateContent reply replayed by mock_llm_api. The checked-in copy is hand-written
+# in the documented response format; --record-llm replaces it with a real reply
+RECORDED_LLM_REPLY = Path(__file__).parent / "fixtures" / "gemini_generate_content.json"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-live",
+        action="store_true",
+        default=False,
+        help="Send LLM requests to the real Gemini API instead of the mocked transport.",
+    )
+    parser.addoption(
+        "--record-llm",
+        action="store_true",
+        default=False,
+        help="Send LLM requests to the real Gemini API and save the reply as the replay fixture (serial runs only).",
+    )
+    parser.addoption(
+        "--offline",
+        action="store_true",
+        default=False,
+        help="Skip tests marked live at collection time, before they import any API client.",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "integration: end-to-end LLM workflow test (mocked unless --run-live is given)"
+    )
+    config.addinivalue_line("markers", "live: test that always calls the real Gemini API")
+    if config.getoption("--offline") and (
+        config.getoption("--run-live") or config.getoption("--record-llm")
+    ):
+        raise pytest.UsageError("--offline cannot be combined with --run-live or --record-llm")
+    if config.getoption("--record-llm") and getattr(config.option, "numprocesses", None):
+        # Parallel workers would all write the same fixture file
+        raise pytest.UsageError("--record-llm must run serially; pass -n0")
+
+
+def pytest_collection_modifyitems(config, items):
+    if not config.getoption("--offline"):
+        return
+    skip_live = pytest.mark.skip(reason="live API test skipped by --offline")
+    for item in items:
+        if "live" in item.keywords:
+            item.add_marker(skip_live)
+
+
+@pytest.fixture(scope="session")
+def env_path():
+    """Return the project-root .env file, or ``None`` when it does not exist."""
+    path = Path(__file__).resolve().parents[2] / ".env"
+    return path if path.exists() else None
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _load_env_file(env_path):
+    """Load the project-root .env file once per test session."""
+    if env_path is not None:
+        load_dotenv(env_path)
+
+
+@pytest.fixture(autouse=True)
+def _reset_llm_chat():
+    """Start every test without a chat session left over from an earlier test."""
+    # A module that was never imported has no session to clear, so don't import it here
+    llm_utils = sys.modules.get("llm_utils")
+    if llm_utils is not None:
+        llm_utils.reset_chat_session()
+    yield
+
+
+@pytest.fixture(scope="session")
+def gemini_api_key(_load_env_file):
+    """Return the Gemini API key, skipping the requesting test when it is not set."""
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        pytest.skip("GEMINI_API_KEY not set")
+    return api_key
+
+
+@pytest.fixture(scope="session")
+def llm_client(gemini_api_key):
+    """Return the Gemini client shared by every live test in the session."""
+    from llm_utils import _get_or_create_client
+
+    return _get_or_create_client(gemini_api_key)
+
+
+@pytest.fixture(scope="session")
+def assert_llm_response_shape():
+    """Return a checker asserting a reply is an LLMResponse with correctly typed fields."""
+    from llm_utils import LLMResponse
+
+    # llm_utils postpones annotations, so resolve the field types once up front
+    field_types = typing.get_type_hints(LLMResponse)
+    fields = [(field.name, field_types[field.name]) for field in dataclasses.fields(LLMResponse)]
+
+    def check(response) -> None:
+        assert isinstance(response, LLMResponse), "Response should be LLMResponse instance"
+        for name, expected_type in fields:
+            assert isinstance(getattr(response, name), expected_type), f"{name} should be {expected_type.__name__}"
+
+    return check
+
+
+def _recording_transport(path: Path) -> httpx.AsyncBaseTransport:
+    """Return a transport that forwards requests and saves successful generateContent replies."""
+    import httpx
+
+    class RecordingTransport(httpx.AsyncBaseTransport):
+        def __init__(self) -> None:
+            self._transport = httpx.AsyncHTTPTransport()
+
+        async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+            response = await self._transport.handle_async_request(request)
+            if response.status_code != 200 or not request.url.path.endswith(":generateContent"):
+                return response
+
+            # The body is decoded here, so the rebuilt response must not claim an encoding
+            body = await response.aread()
+            path.write_text(json.dumps(json.loads(body), indent=2) + "\n", encoding="utf-8")
+            headers = [
+                (name, value)
+                for name, value in response.headers.items()
+                if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+            ]
+            return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+        async def aclose(self) -> None:
+            await self._transport.aclose()
+
+    return RecordingTransport()
+
+
+@pytest.fixture(scope="session")
+def recorded_llm_reply() -> bytes:
+    """Return the recorded generateContent reply body."""
+    return RECORDED_LLM_REPLY.read_bytes()
+
+
+def _patch_client_transport(monkeypatch, transport: httpx.AsyncBaseTransport) -> None:
+    """Make llm_utils build Gemini clients whose async requests go through ``transport``."""
+    from google import genai
+    from google.genai import types
+
+    import llm_utils
+
+    # A custom transport makes the SDK use httpx instead of aiohttp for async calls
+    http_options = types.HttpOptions(async_client_args={"transport": transport})
+    monkeypatch.setattr(
+        llm_utils,
+        "_get_client",
+        lambda api_key: genai.Client(api_key=api_key, http_options=http_options),
+    )
+
+
+@pytest.fixture
+def mock_llm_api(request, monkeypatch):
+    """Answer Gemini requests with the recorded reply over a mocked HTTP transport.
+
+    Yields the list of intercepted ``httpx.Request`` objects. With ``--run-live``
+    the shared live client is used instead, and with ``--record-llm`` the live
+    reply is also saved as the new recording; both yield ``None``.
+    """
+    if request.config.getoption("--record-llm"):
+        request.getfixturevalue("gemini_api_key")
+        _patch_client_transport(monkeypatch, _recording_transport(RECORDED_LLM_REPLY))
+        yield None
+        return
+
+    if request.config.getoption("--run-live"):
+        request.getfixturevalue("llm_client")
+        yield None
+        return
+
+    httpx = pytest.importorskip("httpx")
+    reply = request.getfixturevalue("recorded_llm_reply")
+    intercepted = []
+
+    def handle(http_request: httpx.Request) -> httpx.Response:
+        intercepted.append(http_request)
+        return httpx.Response(200, content=reply, headers={"content-type": "application/json"})
+
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    _patch_client_transport(monkeypatch, httpx.MockTransport(handle))
+    yield intercepted
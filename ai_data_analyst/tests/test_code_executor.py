@@ -0,0 +1,239 @@
+"""Tests for executing LLM-generated analysis code."""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from code_executor import MAX_STDOUT_CHARS, STDOUT_TRUNCATION_MARKER, execute_code
+
+
+def _sample_dataframe() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "region": ["North", "South", "North", "West"],
+            "sales": [100, 250, 175, 50],
+        }
+    )
+
+
+def _wait_for_executor_threads() -> None:
+    deadline = time.monotonic() + 5
+    while any(thread.name == "code-executor" for thread in threading.enumerate()):
+        assert time.monotonic() < deadline, "timed-out worker thread kept running"
+        time.sleep(0.01)
+
+
+def test_execute_code_captures_stdout():
+    """Test that printed output is returned to the caller."""
+    result = execute_code("print(df['sales'].sum())", _sample_dataframe())
+
+    assert result.success
+    assert result.stdout == "575"
+
+
+def test_execute_code_truncates_large_output():
+    """Test that captured stdout is capped with a truncation marker."""
+    result = execute_code("for _ in range(3):\n    print('x' * 40000)", _sample_dataframe())
+
+    assert result.success
+    assert result.stdout.endswith(STDOUT_TRUNCATION_MARKER.strip())
+    assert len(result.stdout) <= MAX_STDOUT_CHARS + len(STDOUT_TRUNCATION_MARKER)
+
+
+def test_execute_code_prints_trailing_expression():
+    """Test that the value of a trailing expression is printed, even across lines."""
+    code = (
+        "totals = df.groupby('region')['sales'].sum()\n"
+        "int(\n"
+        "    totals['North']\n"
+        ")  # North total"
+    )
+    result = execute_code(code, _sample_dataframe())
+
+    assert result.success
+    assert result.stdout == "275"
+
+
+def test_execute_code_prints_single_expression():
+    """Test that a program consisting of one expression prints its value."""
+    result = execute_code("df['region'].nunique()", _sample_dataframe())
+
+    assert result.success
+    assert result.stdout == "3"
+
+
+def test_execute_code_does_not_echo_none():
+    """Test that a trailing call returning None does not add output."""
+    result = execute_code("total = df['sales'].sum()\nprint(total)", _sample_dataframe())
+
+    assert result.stdout == "575"
+
+
+def test_execute_code_does_not_mutate_input():
+    """Test that generated code modifying df leaves the caller's dataframe untouched."""
+    dataframe = _sample_dataframe()
+    result = execute_code(
+        "df['sales'] = df['sales'] * 2\ndf['bonus'] = 1\ndf.loc[0, 'region'] = 'East'",
+        dataframe,
+    )
+
+    assert result.success
+    assert list(dataframe.columns) == ["region", "sales"]
+    assert dataframe["sales"].tolist() == [100, 250, 175, 50]
+    assert dataframe.loc[0, "region"] == "North"
+
+
+def test_execute_code_collects_figures_and_tables():
+    """Test that outputs are gathered once each, in order, without the input dataframe."""
+    code = (
+        "df['share'] = df['sales'] / df['sales'].sum()\n"
+        "totals = df.groupby('region', as_index=False)['sales'].sum()\n"
+        "bar = px.bar(totals, x='region', y='sales')\n"
+        "pie = px.pie(totals, names='region', values='sales')\n"
+        "charts = {'all': [bar, pie]}\n"
+        "charts['self'] = charts"
+    )
+    result = execute_code(code, _sample_dataframe())
+
+    assert result.success
+    assert [figure.data[0].type for figure in result.figures] == ["bar", "pie"]
+    assert len(result.tables) == 1
+    assert result.tables[0]["region"].tolist() == ["North", "South", "West"]
+
+
+def test_execute_code_filters_input_dataframe_by_identity():
+    """Test that only the injected df itself is excluded from tables, not look-alikes."""
+    code = (
+        "data = df\n"
+        "ranked = df.sort_values('sales', ascending=False)\n"
+        "frames = [df, data]"
+    )
+    result = execute_code(code, _sample_dataframe())
+
+    assert result.success
+    assert len(result.tables) == 1
+    assert result.tables[0]["sales"].tolist() == [250, 175, 100, 50]
+
+
+@pytest.mark.parametrize(
+    "output_kind,expected_figures,expected_tables",
+    [(None, 1, 1), ("figure", 1, 0), ("table", 0, 1), ("text", 0, 0)],
+)
+def test_execute_code_collects_declared_output_kind(output_kind, expected_figures, expected_tables):
+    """Test that only the declared kind of output is collected."""
+    code = (
+        "totals = df.groupby('region', as_index=False)['sales'].sum()\n"
+        "fig = px.bar(totals, x='region', y='sales')\n"
+        "print(len(totals))"
+    )
+    result = execute_code(code, _sample_dataframe(), output_kind=output_kind)
+
+    assert result.success
+    assert result.stdout == "3"
+    assert len(result.figures) == expected_figures
+    assert len(result.tables) == expected_tables
+
+
+def test_execute_code_reports_errors():
+    """Test that exceptions are captured instead of propagated."""
+    result = execute_code("df['missing_column']", _sample_dataframe())
+
+    assert not result.success
+    assert "KeyError" in result.error
+
+
+def test_execute_code_rejects_empty_code():
+    """Test that blank code is reported as an error."""
+    result = execute_code("   \n", _sample_dataframe())
+
+    assert result.error == "No code to execute."
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import os",
+        "from pathlib import Path",
+        "df.__class__.__bases__",
+        "__builtins__",
+        "open('data.csv')",
+        "eval('1 + 1')",
+        "import pandas as np",
+    ],
+)
+def test_execute_code_rejects_disallowed_constructs(code):
+    """Test that unsafe constructs are rejected before any code runs."""
+    result = execute_code(code, _sample_dataframe())
+
+    assert result.error.startswith("Disallowed construct:")
+
+
+def test_execute_code_allows_preloaded_imports():
+    """Test that importing the modules already in the namespace is accepted as a no-op."""
+    code = (
+        "import pandas as pd\nimport plotly.express as px\nfrom plotly.subplots import make_subplots\n"
+        "fig = make_subplots(rows=1, cols=2)"
+    )
+    result = execute_code(code, _sample_dataframe())
+
+    assert result.success, result.error
+    assert len(result.figures) == 1
+
+
+@pytest.mark.parametrize("handler", ["except:", "except (KeyError, BaseException):"])
+def test_execute_code_narrows_catch_all_handlers(handler):
+    """Test that catch-all handlers still catch errors but not the timeout interrupt."""
+    result = execute_code(f"try:\n    df['missing']\n{handler}\n    print('caught')", _sample_dataframe())
+    assert result.stdout == "caught"
+
+    code = f"while True:\n    try:\n        pass\n    {handler}\n        pass"
+    result = execute_code(code, _sample_dataframe(), timeout=0.2)
+    assert result.error == "Execution timed out after 0.2 seconds."
+    _wait_for_executor_threads()
+
+
+def test_execute_code_times_out():
+    """Test that runaway code is stopped once it exceeds the time budget."""
+    started = time.monotonic()
+    result = execute_code("while True:\n    pass", _sample_dataframe(), timeout=0.2)
+
+    assert result.error == "Execution timed out after 0.2 seconds."
+    assert time.monotonic() - started < 5
+    _wait_for_executor_threads()
+
+
+def test_execute_code_times_out_code_that_outlives_first_interrupt():
+    """Test that the interrupt is repeated until the worker thread has actually stopped."""
+    code = "try:\n    while True:\n        pass\nfinally:\n    while True:\n        pass"
+    result = execute_code(code, _sample_dataframe(), timeout=0.2)
+
+    assert result.error == "Execution timed out after 0.2 seconds."
+    _wait_for_executor_threads()
+
+
+def test_execute_code_leaves_process_stdout_alone(capsys):
+    """Test that output is captured per run and other threads keep printing normally."""
+    result = execute_code("print('captured')\ndf.info()", _sample_dataframe())
+    print("outside")
+
+    assert result.stdout.startswith("captured\n<class 'pandas")
+    assert capsys.readouterr().out == "outside\n"
+
+
+def test_execute_code_keeps_stdout_stream_attributes(monkeypatch):
+    """Test that sys.stdout still reports the real stream's encoding and file descriptor."""
+    with open(os.devnull, "w", encoding="utf-8") as stream:
+        monkeypatch.setattr(sys, "stdout", stream)
+        execute_code("print('captured')", _sample_dataframe())
+
+        assert sys.stdout is not stream
+        assert sys.stdout.encoding == stream.encoding
+        assert sys.stdout.errors == stream.errors
+        assert sys.stdout.fileno() == stream.fileno()
+        assert sys.stdout.writable() and not sys.stdout.isatty()
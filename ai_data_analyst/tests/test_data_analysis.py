@@ -0,0 +1,127 @@
+"""Tests for CSV loading and dataset summaries."""
+
+from __future__ import annotations
+
+import io
+
+import pandas as pd
+import pytest
+
+from data_analysis import DatasetSummary, get_summary
+
+
+SAMPLE_CSV = (
+    "country,sales,channel,flag\n"
+    "Egypt,100,Online,True\n"
+    "Egypt,,Retail,False\n"
+    "France,300,Online,True\n"
+    "Spain,400,,False\n"
+).encode("utf-8")
+
+
+def _column(summary: DatasetSummary, name: str) -> dict:
+    return next(column for column in summary.details["columns"] if column["name"] == name)
+
+
+def test_get_summary_accepts_bytes():
+    """Test that raw CSV bytes can be summarised directly."""
+    summary = get_summary(SAMPLE_CSV)
+
+    assert isinstance(summary, DatasetSummary)
+    assert summary.details["shape"] == {"rows": 4, "columns": 4}
+    assert summary.details["missing_values"] == {"total_missing": 2, "missing_pct": 12.5}
+    assert summary.encoding == "utf-8"
+
+
+def test_numeric_column_statistics():
+    """Test that numeric columns report formatted statistics and missing counts."""
+    sales = _column(get_summary(SAMPLE_CSV), "sales")
+
+    assert sales["missing_count"] == 1
+    assert sales["missing_pct"] == 25.0
+    assert sales["statistics"] == {
+        "mean": "266.67",
+        "median": "300.00",
+        "std": "152.75",
+        "min": "100.00",
+        "max": "400.00",
+    }
+
+
+def test_categorical_column_values():
+    """Test that low-cardinality categorical columns list all their values."""
+    summary = get_summary(SAMPLE_CSV)
+    country = _column(summary, "country")
+    channel = _column(summary, "channel")
+
+    assert country["unique_count"] == 3
+    assert country["all_unique_values"] == ["Egypt", "France", "Spain"]
+    assert channel["missing_count"] == 1
+    assert channel["all_unique_values"] == ["Online", "Retail"]
+
+
+def test_high_cardinality_column_top_values():
+    """Test that high-cardinality columns only report their most frequent values."""
+    rows = "\n".join(["code"] + ["repeat"] * 5 + [f"code-{i}" for i in range(60)])
+    code = _column(get_summary(rows.encode("utf-8"), max_top_values=2), "code")
+
+    assert code["unique_count"] == 61
+    assert "all_unique_values" not in code
+    assert code["top_values"][0] == {"value": "repeat", "count": 5}
+    assert len(code["top_values"]) == 2
+
+
+# Temporal and wide-integer columns, once parsed by PyArrow and once (via the ragged
+# last row) by the pandas fallback
+_TYPED_CSVS = {
+    "arrow": b"day,time,n,big\n2024-01-05,10:11:12,1,18446744073709551615\n2024-02-01,11:00:00,2,5\n",
+    "pandas": b"day,time,n,big\n2024-01-05,10:11:12,1,18446744073709551615\n2024-02-01,11:00:00\n",
+}
+
+
+@pytest.mark.parametrize("path", sorted(_TYPED_CSVS))
+def test_dtypes_match_pandas_on_both_parsers(path):
+    """Test that dates and times stay text and wide integers stay exact, whichever parser runs."""
+    raw = _TYPED_CSVS[path]
+    summary = get_summary(raw)
+
+    expected = pd.read_csv(io.BytesIO(raw)).dtypes
+    assert summary.dataframe.dtypes.to_dict() == expected.to_dict()
+    assert summary.dataframe["day"].tolist() == ["2024-01-05", "2024-02-01"]
+    assert summary.dataframe["time"].tolist() == ["10:11:12", "11:00:00"]
+    assert str(summary.dataframe["big"].iloc[0]) == "18446744073709551615"
+    assert _column(summary, "day")["all_unique_values"] == ["2024-01-05", "2024-02-01"]
+
+
+def test_text_summary_mentions_every_column():
+    """Test that the LLM-facing text summary covers each column."""
+    text = get_summary(SAMPLE_CSV).text
+
+    assert text.startswith("Dataset with 4 rows and 4 columns.")
+    for name in ("country", "sales", "channel", "flag"):
+        assert f" - {name} (" in text
+
+
+def test_non_utf8_file_falls_back_to_other_encoding():
+    """Test that files which are not valid UTF-8 are still loaded."""
+    summary = get_summary("city,value\nS\u00e3o Paulo,1\nK\u00f6ln,2\n".encode("latin-1"))
+
+    assert summary.encoding != "utf-8"
+    assert _column(summary, "city")["all_unique_values"] == ["K\u00f6ln", "S\u00e3o Paulo"]
+
+
+def test_pandas_na_tokens_count_as_missing():
+    """Test that pandas' default NA tokens are treated as missing values."""
+    summary = get_summary(b"label,value\nNone,1\n<NA>,NaN\nNULL,3\nok,n/a\n")
+
+    assert _column(summary, "label")["missing_count"] == 3
+    assert _column(summary, "value")["missing_count"] == 2
+    assert pd.api.types.is_float_dtype(summary.dataframe["value"])
+
+
+def test_empty_header_is_named_like_pandas():
+    """Test that an empty header cell becomes pandas' 'Unnamed: N' column."""
+    summary = get_summary(b",value\n0,1\n1,2\n")
+
+    assert list(summary.dataframe.columns) == ["Unnamed: 0", "value"]
+
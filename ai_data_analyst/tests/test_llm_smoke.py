@@ -0,0 +1,71 @@
+"""Smoke tests for the LLM configuration and a single request round-trip."""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+
+import pytest
+
+
+logger = logging.getLogger(__name__)
+
+# The one variable llm_utils needs from .env, expected near the top of the file
+_ENV_API_KEY = re.compile(rb"^\s*(?:export\s+)?GEMINI_API_KEY\s*=", re.MULTILINE)
+_ENV_SCAN_BYTES = 4096
+
+# Fixed request inputs for the smoke round-trip
+_SALES_SUMMARY = (
+    "Dataset: Sales Data\n"
+    "- Rows: 100\n"
+    "- Columns: 5\n"
+    "- Columns: date (datetime), product (string), sales (numeric), region (string), category (string)\n"
+    "- Missing values: 2%"
+)
+_Q_COLS = "What are the column names in this dataset?"
+
+
+def test_env_and_imports(env_path):
+    """Test that a .env file, if present, configures Gemini and the llm_utils API imports."""
+    if env_path is not None:
+        with env_path.open("rb") as env_file:
+            head = env_file.read(_ENV_SCAN_BYTES)
+        assert _ENV_API_KEY.search(head), ".env should define GEMINI_API_KEY"
+
+    from llm_utils import (
+        LLMResponse,
+        LLMResponseError,
+        ask_llm,
+        ask_llm_batch,
+        reset_chat_session,
+        send_execution_results,
+    )
+
+    assert all([LLMResponse, LLMResponseError, ask_llm, ask_llm_batch, reset_chat_session, send_execution_results])
+
+
+@pytest.mark.integration
+def test_ask_llm_smoke(mock_llm_api, assert_llm_response_shape):
+    """Test one request round-trip against the Gemini API (mocked by default)."""
+    from llm_utils import ask_llm
+
+    response = ask_llm(
+        user_query=_Q_COLS,
+        data_summary=_SALES_SUMMARY,
+        reset_chat=True,
+        temperature=0.2
+    )
+
+    # Verify response structure
+    assert_llm_response_shape(response)
+    assert len(response.analysis) > 0, "Analysis should not be empty"
+    assert len(response.suggestions) > 0, "Suggestions should not be empty"
+    if mock_llm_api is not None:
+        assert len(mock_llm_api) == 1, "Only one request should be sent"
+        assert mock_llm_api[0].url.path.endswith(":generateContent")
+        sent = json.loads(mock_llm_api[0].content)["contents"][-1]["parts"][0]["text"]
+        assert _Q_COLS in sent and _SALES_SUMMARY in sent, "Query and summary go in one message"
+
+    logger.debug("LLM reply analysis: %s", response.analysis)
+    logger.debug("LLM reply code: %s", response.code or "No code")
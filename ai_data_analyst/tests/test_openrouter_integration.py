@@ -1,104 +1,10 @@
-"""End-to-end test for OpenRouter API integration."""
+"""Check that the OpenAI client package used for OpenRouter is installed."""
 
 from __future__ import annotations
 
-import os
-import sys
-from pathlib import Path
-
-import pytest
-
-# Add src directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-
-
-def test_env_file_exists():
-    """Test that .env file exists and has the correct variables."""
-    env_path = Path(__file__).parent.parent.parent / ".env"
-    assert env_path.exists(), ".env file should exist in project root"
-    
-    # Read and verify content
-    content = env_path.read_text()
-    assert "OPENROUTER_API_KEY" in content, ".env should contain OPENROUTER_API_KEY"
-    assert "deepseek/deepseek-chat-v3.1" in content, ".env should contain the model name"
-    
-    # Verify API key is set
-    api_key = os.getenv("OPENROUTER_API_KEY")
-    if api_key:
-        assert api_key.startswith("sk-or-v1-"), "API key format should be correct"
+import importlib.util
 
 
 def test_openai_client_import():
-    """Test that OpenAI client can be imported."""
-    try:
-        from openai import OpenAI
-        assert OpenAI is not None
-    except ImportError as e:
-        pytest.fail(f"Failed to import OpenAI client: {e}")
-
-
-def test_llm_utils_imports():
-    """Test that all llm_utils functions can be imported."""
-    try:
-        from llm_utils import (
-            ask_llm,
-            reset_chat_session,
-            LLMResponse,
-            LLMResponseError,
-        )
-        assert all([ask_llm, reset_chat_session, LLMResponse, LLMResponseError])
-    except ImportError as e:
-        pytest.fail(f"Failed to import from llm_utils: {e}")
-
-
-def test_basic_api_call():
-    """Test a basic API call to OpenRouter (if API key is valid)."""
-    from llm_utils import ask_llm, reset_chat_session
-    
-    # Reset session first
-    reset_chat_session()
-    
-    # Check if API key is available
-    api_key = os.getenv("OPENROUTER_API_KEY")
-    if not api_key:
-        pytest.skip("OPENROUTER_API_KEY not set")
-    
-    # Make a simple test call
-    try:
-        test_summary = "A simple dataset with 5 rows and 2 columns: name (string), age (integer)"
-        test_query = "What is the structure of this dataset?"
-        
-        response = ask_llm(
-            user_query=test_query,
-            data_summary=test_summary,
-            reset_chat=True,
-            temperature=0.2
-        )
-        
-        # Verify response structure
-        assert response is not None
-        assert hasattr(response, 'analysis')
-        assert hasattr(response, 'code')
-        assert hasattr(response, 'suggestions')
-        assert isinstance(response.analysis, str)
-        assert isinstance(response.code, str)
-        assert isinstance(response.suggestions, str)
-        
-        print(f"\n✅ API call successful!")
-        print(f"Analysis length: {len(response.analysis)} chars")
-        print(f"Code length: {len(response.code)} chars")
-        
-    except Exception as e:
-        error_msg = str(e).lower()
-        # If it's an API/auth error, that's okay for testing - means the integration works
-        if "api" in error_msg or "key" in error_msg or "auth" in error_msg or "rate" in error_msg:
-            pytest.skip(f"API call failed (may be auth/rate limit issue): {e}")
-        else:
-            # Re-raise unexpected errors
-            raise
-
-
-
-
-
-
+    """Test that the OpenAI client package is installed, without importing it."""
+    assert importlib.util.find_spec("openai") is not None, "openai package should be installed"